@@ -24,6 +24,7 @@
 import sys
 import email
 import email.policy
+import mime_walk
 
 
 ALT = 'multipart/alternative'
@@ -59,18 +60,14 @@ if not msg.is_multipart():
 
 # Find the first 'multipart/alternative' part in the message
 # Also keep track of whether it is part of a multipart/related part
-alt = None
 container = msg
 fix_main_content_type = False
-for part in msg.walk():
+for part in mime_walk.walk(msg):
     if (part.get_content_type() == REL) and (part.get_param('type') == ALT):
         container = part
         fix_main_content_type = True
         break
-for part in container.walk():
-    if (part.get_content_type() == ALT):
-        alt = part
-        break
+alt = mime_walk.find_first(container, ALT)
 
 # Check that there is a 'multipart/alternative' part in the message
 if not alt:
@@ -21,6 +21,7 @@
 import sys
 import email
 import email.policy
+import mime_walk
 
 
 CHARSETS = {
@@ -49,7 +50,7 @@ email_policy = email.policy.EmailPolicy(
 msg = email.message_from_bytes(sys.stdin.buffer.read(), policy=email_policy)
 
 # Replace charset string in Content-Type header
-for part in msg.walk():
+for part in mime_walk.walk(msg):
     if part.get_content_type() in {'text/plain', 'text/html'}:
         part.set_charset(charset)
 
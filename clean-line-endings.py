@@ -20,7 +20,8 @@
 import sys
 import email
 import email.policy
-import re
+import mime_walk
+import text_cleaners
 
 
 # Check whether no arguments have been given to the script (it takes none)
@@ -35,16 +36,11 @@ email_policy = email.policy.EmailPolicy(
 # Read and parse the message from stdin
 msg = email.message_from_bytes(sys.stdin.buffer.read(), policy=email_policy)
 
-# Prepare regexps
-spaces_at_line_end = re.compile(r"(?<!--|.:)[  ]+(?=\n)")
-
 # Clean line endings
-for part in msg.walk():
-    if part.get_content_type() == 'text/plain':
-        if part['Content-Type'].params.get('format') != "flowed":
-          text = part.get_content()
-          text = spaces_at_line_end.sub('', text)
-          part.set_content(text, cte='8bit')
+parts = [part for part in mime_walk.walk(msg)
+         if part.get_content_type() == 'text/plain'
+         and part['Content-Type'].params.get('format') != "flowed"]
+text_cleaners.apply_rules_batch(text_cleaners.CLEAN_LINE_ENDINGS_RULES, parts)
 
 # Check whether no errors were found in the message (parts)
 if len(msg.defects) > 0:
@@ -21,8 +21,8 @@
 import sys
 import email
 import email.policy
-import re
-from urllib.parse import unquote
+import mime_walk
+import text_cleaners
 
 
 # Check whether no arguments have been given to the script (it takes none)
@@ -37,68 +37,10 @@ email_policy = email.policy.EmailPolicy(
 # Read and parse the message from stdin
 msg = email.message_from_bytes(sys.stdin.buffer.read(), policy=email_policy)
 
-# Prepare regexps
-# link rewriters
-outlook = re.compile(r'(?i)https://\w+.safelinks\.protection\.outlook\.com/'
-                     r'[\w/-]*\?url=([^&]*)&\S*reserved=0')
-proofpoint2 = re.compile(r'(?i)https://urldefense\.proofpoint\.com/v2/url\?'
-                         r'u=([^=&]*)&\S*(?:(?= [^>\]\)])| ?)')
-proofpoint3 = re.compile(r'(?i)https://urldefense\.com/v3/__(.*)__;[^\$]*\$')
-fireeye = re.compile(r'(?i)https://protect3-qa\.fireeye\.com/v1/url\?.*'
-                     r'u=([^>\s\]\)]+)')
-clicktime = re.compile(r'(?i)https://[\w-]+\.trendmicro\.com(?:\:443)?/wis/'
-                       r'clicktime/v1/query\?url=(.+)&umid=[\w-]+&auth=[\w-]+')
-vadesecure4 = re.compile(r'(?i)https://antiphishing.vadesecure.com/v4?.*u=(.*)')
-# typical doublings
-href = re.compile(r'(?i)(?:https?://)?([^<>\[\]\(\)]{3,})\s*?'
-                  r'[<\[\(] *?(https?://\1/?) *?[\)\]>]')
-mailto = re.compile(r'(?i)([\'"]?)([^<>\[\]\(\)\'"]{3,})\1\s*?'
-                    r'[<\[\(] *?(?:mailto:|sip:|tel:)?\2 *?[\)\]>]')
-# warning note
-exchangewarning_text = re.compile(
-    r"\[?"
-    r"([A-Z][\w\s'-]* \S*@\S*\. [A-Z][\w\s'-]+)\s*"
-    r"(<?https://aka\.ms/LearnAboutSenderIdentification>?\s*)"
-    r"\]?\n*")
-exchangewarning_html = re.compile(
-    r"[A-Z]{0,1}[\w\s'-]*.*@.*\. "
-    r"\[\s*[A-Z][\w\s'-]+\]\[1\](?:\s*\n)+"
-    r"\s*\[1\]: https://aka.ms/LearnAboutSenderIdentification\n*")
-# random stuff
-nbsp = re.compile(r'&nbsp;')
-
-
-# Custom replacement functions
-
-def rewriter_fix(rewriter=None):
-
-    def fixer(match):
-        link = match[1]
-        if rewriter == 'proofpoint2':
-            link = link.replace('_', '/').replace('-', '%')
-        if rewriter == 'proofpoint3':
-            link = link.replace('*', '%')
-        return unquote(link)
-
-    return fixer
-
-
 # Clean up link fragments
-for part in msg.walk():
-    if part.get_content_type() == 'text/plain':
-        text = part.get_content()
-        text = exchangewarning_text.sub('', text)
-        text = exchangewarning_html.sub('', text)
-        text = outlook.sub(rewriter_fix(), text)
-        text = proofpoint2.sub(rewriter_fix('proofpoint2'), text)
-        text = proofpoint3.sub(rewriter_fix('proofpoint3'), text)
-        text = fireeye.sub(rewriter_fix(), text)
-        text = vadesecure4.sub(rewriter_fix(), text)
-        text = clicktime.sub(rewriter_fix(), text)
-        text = href.sub(r'\2', text)
-        text = mailto.sub(r'\2', text)
-        text = nbsp.sub(' ', text)
-        part.set_content(text, cte='8bit')
+parts = [part for part in mime_walk.walk(msg)
+         if part.get_content_type() == 'text/plain']
+text_cleaners.apply_rules_batch(text_cleaners.CLEAN_TEXT_VERSION_RULES, parts)
 
 # Check whether no errors were found in the message (parts)
 if len(msg.defects) > 0:
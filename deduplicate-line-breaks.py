@@ -20,7 +20,8 @@
 import sys
 import email
 import email.policy
-import re
+import mime_walk
+import text_cleaners
 
 
 # Check whether no arguments have been given to the script (it takes none)
@@ -35,19 +36,11 @@ email_policy = email.policy.EmailPolicy(
 # Read and parse the message from stdin
 msg = email.message_from_bytes(sys.stdin.buffer.read(), policy=email_policy)
 
-# Prepare regexps
-extra_br_needed = re.compile(r"((?:\s*\[\d+\]:|\*\w+:\*) .*\n\n)(?!\n)")
-to_deduplicate = re.compile(r"(\n){2}(?!\s*\[\d+\])")
-quote_to_deduplicate = re.compile(r"(\n>+ ){2}(?!\s*\[\d+\])")
-
 # Deduplicate line breaks
-for part in msg.walk():
-    if part.get_content_type() == 'text/plain':
-        text = part.get_content()
-        text = extra_br_needed.sub(r"\1\n", text)
-        text = to_deduplicate.sub(r"\1", text)
-        text = quote_to_deduplicate.sub(r"\1", text)
-        part.set_content(text, cte='8bit')
+parts = [part for part in mime_walk.walk(msg)
+         if part.get_content_type() == 'text/plain']
+text_cleaners.apply_rules_batch(text_cleaners.DEDUPLICATE_LINE_BREAKS_RULES,
+                                parts)
 
 # Check whether no errors were found in the message (parts)
 if len(msg.defects) > 0:
@@ -19,11 +19,14 @@
 """
 
 import sys
+import os
 import email
 import email.policy
-import re
-import bs4
 import html2text
+import mime_walk
+import slim_html
+import quoted_html
+import text_cleaners
 
 
 # Check whether no arguments have been given to the script (it takes none)
@@ -39,54 +42,147 @@ email_policy = email.policy.EmailPolicy(
 msg = email.message_from_bytes(sys.stdin.buffer.read(), policy=email_policy)
 
 # Find the first 'text/html' part
-replaceable = None
-for part in msg.walk():
-    content_type = part.get_content_type()
-    if content_type == 'text/html':
-        replaceable = part
-        break
+replaceable = mime_walk.find_first(msg, 'text/html')
 
 # Check that there is a 'text/html' part
 if not replaceable:
     raise ValueError("Message does not contain a 'text/html' part.")
 html = replaceable.get_content()
 
-# # Prepare whitespace to shift whitespace out of tags
-# surrounding_whitespace = re.compile(r"(\s*)(.*)(\s*)")
-# 
-# # Apply some fixes to html before converting to text
-# soup = bs4.BeautifulSoup(html, "html5lib")
-# 
-# for tagtype in {"i", "b", "em", "strong"}:
-#     for match in soup(tagtype):
-#         parts = surrounding_whitespace.fullmatch(match.string)
-#         tag = soup.new_tag(tagtype)
-#         tag.string = parts[2]
-#         match.replace_with(parts[1], tag, parts[3])
-# 
-# for match in soup("a"):
-#     href = match["href"]
-#     print(href)
-#     text = match.string
-#     if text is None:
-#         # We avoid processing in case the content of the anchor is complex
-#         continue
-#     parts = surrounding_whitespace.fullmatch(text)
-#     if href.endswith(parts[2]):
-#         if href.startswith("mailto:"):
-#             match.replace_with(parts[1], parts[2], parts[3])
-#         else:
-#             match.replace_with(parts[1], href, parts[3])
-#     else:
-#         tag = soup.new_tag("a")
-#         tag["href"] = href
-#         tag.string = parts[2]
-#         match.replace_with(parts[1], tag, parts[3])
-# 
-# html = str(soup)
+# Remove dead weight from the html before converting it
+html, removed = slim_html.slim(html)
+slim_html.report(removed)
+
+# Apply some fixes to the html while it is being converted to text; this is
+# done on the parser's token stream, so no document tree needs to be built
+EMPHASIS = {'i', 'b', 'em', 'strong'}
+
+
+def split_whitespace(items):
+    """Split buffered (data, entity_char) items into lead, core, and trail"""
+    nbsp = html2text.config.UNIFIABLE['nbsp']  # placeholder set by html2text
+    items = list(items)
+    lead = []
+    while items:
+        data, entity_char = items[0]
+        stripped = '' if data == nbsp else data.lstrip()
+        if stripped:
+            if stripped != data:
+                lead.append((data[:len(data) - len(stripped)], entity_char))
+                items[0] = (stripped, entity_char)
+            break
+        lead.append(items.pop(0))
+    trail = []
+    while items:
+        data, entity_char = items[-1]
+        stripped = '' if data == nbsp else data.rstrip()
+        if stripped:
+            if stripped != data:
+                trail.insert(0, (data[len(stripped):], entity_char))
+                items[-1] = (stripped, entity_char)
+            break
+        trail.insert(0, items.pop())
+    return lead, items, trail
+
+
+class FixingHTML2Text(html2text.HTML2Text):
+    # The content of emphasis and anchor tags is buffered until their end tag
+    # is seen, as long as it is simple (text only); whitespace is then moved
+    # out of the tags and anchors with their target as text are collapsed.
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buffered_tag = None
+        self.buffered_attrs = None
+        self.buffered_items = []
+        self.after_amp = False
+
+    def replay(self, items):
+        for data, entity_char in items:
+            super().handle_data(data, entity_char)
+
+    def flush(self):
+        # give up on the buffered tag, its content is not simple
+        if self.buffered_tag is not None:
+            tag, attrs, items = (self.buffered_tag, self.buffered_attrs,
+                                 self.buffered_items)
+            self.buffered_tag = None
+            self.buffered_items = []
+            super().handle_starttag(tag, attrs)
+            self.replay(items)
+
+    def handle_starttag(self, tag, attrs):
+        self.flush()
+        self.after_amp = False
+        # some senders escape ampersands twice in link targets
+        attrs = [(name, value.replace('&amp;', '&') if value else value)
+                 for name, value in attrs]
+        if tag in EMPHASIS or (tag == 'a' and dict(attrs).get('href')):
+            self.buffered_tag = tag
+            self.buffered_attrs = attrs
+        else:
+            super().handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        self.after_amp = False
+        if tag != self.buffered_tag:
+            self.flush()
+            super().handle_endtag(tag)
+            return
+        attrs, items = self.buffered_attrs, self.buffered_items
+        self.buffered_tag = None
+        self.buffered_items = []
+        lead, core, trail = split_whitespace(items)
+        # html2text only collapses whitespace within a data chunk
+        nbsp = html2text.config.UNIFIABLE['nbsp']
+        if self.preceding_data[-1:].isspace():
+            lead = [(data, entity_char) for data, entity_char in lead
+                    if data == nbsp or not data.isspace()]
+        self.replay(lead)
+        text = ''.join(data for data, entity_char in core)
+        href = dict(attrs).get('href')
+        if tag == 'a' and href.endswith(text):
+            # this includes anchors with only whitespace as text
+            if href.startswith('mailto:'):
+                self.replay(core)
+            else:
+                super().handle_data(href, True)
+        elif not core:
+            pass
+        else:
+            super().handle_starttag(tag, attrs)
+            self.replay(core)
+            super().handle_endtag(tag)
+        self.replay(trail)
+
+    def handle_entityref(self, c):
+        super().handle_entityref(c)
+        self.after_amp = (c == 'amp')
+
+    def handle_data(self, data, entity_char=False):
+        # undo ampersands that were escaped twice ('&amp;amp;')
+        if self.after_amp and not entity_char and data.startswith('amp;'):
+            data = data[len('amp;'):]
+        self.after_amp = False
+        # html2text escapes dashes and periods that may start a markdown list
+        # (\-, \.), but every data chunk looks like the start of a line to it,
+        # so we do the escaping ourselves without those
+        if not (entity_char or self.code or self.pre):
+            data = html2text.config.RE_MD_BACKSLASH_MATCHER.sub(r"\\\1", data)
+            data = html2text.config.RE_MD_PLUS_MATCHER.sub(r"\1\\\2", data)
+            entity_char = True
+        if self.buffered_tag is not None:
+            self.buffered_items.append((data, entity_char))
+        else:
+            super().handle_data(data, entity_char)
+
+    def close(self):
+        super().close()
+        self.flush()
+
 
 # Generate the 'text/plain' part
-parser = html2text.HTML2Text()
+parser = FixingHTML2Text()
 parser.body_width = 0
 parser.links_each_paragraph = True
 #parser.single_line_break = True
@@ -99,26 +195,17 @@ parser.strong_mark = '*'
 parser.images_to_alt = True
 parser.ignore_tables = True
 parser.use_automatic_links = True
-plain = parser.handle(html)
-# html2text apparently doesn't convert &amp; to &, so we do it
-plain = plain.replace('&amp;', '&')
-# html2text incorrectly escapes dashes and periods sometimes (\-, \.),
-# so we undo this, at the risk of removing true occurrences
-plain = plain.replace(r'\-', '-')
-plain = plain.replace(r'\.', '.')
-# there may be other things like this…
-
-# prepare cleanup regexps for common issues after conversion
-nbsp = re.compile(r'\n{2}[*/]? [*/]?(?=\n)')
-spaces = re.compile(r'\n{2}  \n{3}')
-quote_nbsp = re.compile(r'(\n>+ ){2}[*/]? [*/]?(?=\n)')
-quote_spaces = re.compile(r'(\n>+ ){2}  \1{3}')
-
-# do cleanup using the regexps
-plain = nbsp.sub(r'\n', plain)
-plain = spaces.sub(r'\n', plain)
-plain = quote_nbsp.sub(r'\1', plain)
-plain = quote_spaces.sub(r'\1', plain)
+# if MAILFILTERS_QUOTE_CACHE is set to a cache directory, reuse the
+# conversions of quoted thread history converted for earlier messages
+quote_cache_directory = os.environ.get('MAILFILTERS_QUOTE_CACHE')
+if quote_cache_directory:
+    quote_cache = quoted_html.QuoteCache(quote_cache_directory)
+    plain = quoted_html.convert(parser, html, quote_cache)
+else:
+    plain = parser.handle(html)
+
+# clean up common issues after conversion
+plain = text_cleaners.apply_rules(text_cleaners.HTML2TEXT_CLEANUP_RULES, plain)
 
 # replace the html part by the 'multipart/alternative'
 replaceable.add_alternative(plain, cte='8bit')
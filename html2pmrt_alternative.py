@@ -20,6 +20,8 @@ import sys
 import email
 import email.policy
 import h2pmrt
+import mime_walk
+import slim_html
 
 
 # Check whether no arguments have been given to the script (it takes none)
@@ -35,18 +37,17 @@ email_policy = email.policy.EmailPolicy(
 msg = email.message_from_bytes(sys.stdin.buffer.read(), policy=email_policy)
 
 # Find the first 'text/html' part
-replaceable = None
-for part in msg.walk():
-    content_type = part.get_content_type()
-    if content_type == 'text/html':
-        replaceable = part
-        break
+replaceable = mime_walk.find_first(msg, 'text/html')
 
 # Check that there is a 'text/html' part
 if not replaceable:
     raise ValueError("Message does not contain a 'text/html' part.")
 html = replaceable.get_content()
 
+# Remove dead weight from the html before converting it
+html, removed = slim_html.slim(html)
+slim_html.report(removed)
+
 # Generate the 'text/plain' part
 plain = h2pmrt.convert(html)
 
@@ -0,0 +1,65 @@
+"""
+  mime_walk.py: A module for walking over the parts of a message without
+  recursion, as a replacement for msg.walk(). The parts are generated in the
+  same (depth-first) order, but only as they are needed, so that a search for
+  the first matching part stops there. Messages nested more deeply or having
+  more parts than the limits are rejected with a ValueError. The default
+  limits can be changed with the MAILFILTERS_MAX_DEPTH and
+  MAILFILTERS_MAX_PARTS environment variables.
+
+  Copyright (C) 2026 Erik Quaeghebeur
+
+  This program is free software: you can redistribute it and/or modify it under
+  the terms of the GNU General Public License as published by the Free Software
+  Foundation, either version 3 of the License, or (at your option) any later
+  version. This program is distributed in the hope that it will be useful, but
+  WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+  FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+  details. You should have received a copy of the GNU General Public License
+  along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+
+
+# Limits on the nesting depth (the message itself is at depth 0) and on the
+# number of parts (the message itself included)
+MAX_DEPTH = int(os.environ.get('MAILFILTERS_MAX_DEPTH', 64))
+MAX_PARTS = int(os.environ.get('MAILFILTERS_MAX_PARTS', 10000))
+
+
+def walk(msg, max_depth=None, max_parts=None):
+    """Generate the message and all its subparts, like msg.walk()"""
+    max_depth = MAX_DEPTH if max_depth is None else max_depth
+    max_parts = MAX_PARTS if max_parts is None else max_parts
+    stack = [(msg, 0)]  # parts still to generate, the next one last
+    count = 0
+    while stack:
+        part, depth = stack.pop()
+        count += 1
+        if count > max_parts:
+            raise ValueError(f"Message has more than {max_parts} parts.")
+        if depth > max_depth:
+            raise ValueError(f"Message is nested deeper than {max_depth} "
+                             "levels.")
+        yield part
+        if part.is_multipart():
+            stack.extend((subpart, depth + 1)
+                         for subpart in reversed(part.get_payload()))
+
+
+def find_first(msg, content_type, max_depth=None, max_parts=None):
+    """Return the first part with the given content type, or None
+
+    The content type may also be a function that is given a part and returns
+    whether it matches.
+    """
+    if callable(content_type):
+        matches = content_type
+    else:
+        def matches(part):
+            return part.get_content_type() == content_type
+    for part in walk(msg, max_depth, max_parts):
+        if matches(part):
+            return part
+    return None
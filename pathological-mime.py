@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+
+"""
+  pathological-mime.py: A script that generates rfc822 compliant messages with
+  pathological MIME trees for testing the filter scripts, and benchmarks the
+  traversal of such trees. Called as 'pathological-mime.py SHAPE N', it gives
+  as stdout-output a message of N parts with the given shape:
+
+    wide          a 'multipart/mixed' part with 'text/plain' subparts
+    deep          'multipart/mixed' parts each nested in the previous one
+    alternatives  a 'multipart/mixed' part with 'multipart/alternative'
+                  subparts, each with a 'text/plain' and a 'text/html' part,
+                  followed by up to two 'text/plain' parts to make up N
+
+  For wide and deep messages, the only 'text/html' part comes last. Called
+  with '--benchmark', it instead times walking over and finding the first
+  'text/html' part in trees of each shape for doubling numbers of parts, and
+  raises an exception if the time does not scale linearly. To be robust
+  against memory cache effects, the walking times are compared to those of
+  a plain loop over the same parts, and the scaling is judged by the slope
+  of a fit of the logarithms of the times against those of the numbers of
+  parts, using the median of repeated timings. With '--filter NAME'
+  (repeatable), the named filter scripts are also timed on wide messages.
+
+  Copyright (C) 2026 Erik Quaeghebeur
+
+  This program is free software: you can redistribute it and/or modify it under
+  the terms of the GNU General Public License as published by the Free Software
+  Foundation, either version 3 of the License, or (at your option) any later
+  version. This program is distributed in the hope that it will be useful, but
+  WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+  FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+  details. You should have received a copy of the GNU General Public License
+  along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import sys
+import os
+import argparse
+import gc
+import math
+import statistics
+import subprocess
+import time
+import email.message
+import mime_walk
+
+
+SHAPES = ['wide', 'deep', 'alternatives']
+HERE = os.path.dirname(os.path.realpath(__file__))
+
+# The fitted exponent of the time as a power of the number of parts may at
+# most be this; for linear scaling, it is 1, for quadratic scaling 2
+MAX_EXPONENT = 1.3
+
+
+def message(shape, n):
+    """Return a message of n parts (the message itself included) as bytes"""
+    if n < 3:
+        raise ValueError("A message needs at least 3 parts.")
+    lines = ["From: sender@example.org", "To: recipient@example.org",
+             f"Subject: {shape} message of {n} parts", "MIME-Version: 1.0"]
+
+    def leaf(subtype, k):
+        lines.extend([f"Content-Type: text/{subtype}; charset=utf-8", "",
+                      f"Part {k}" if subtype == 'plain'
+                      else f"<p>Part <b>{k}</b></p>"])
+
+    if shape == 'wide':
+        lines.extend(['Content-Type: multipart/mixed; boundary="b"', ""])
+        for k in range(1, n):
+            lines.append("--b")
+            leaf('plain' if k < n - 1 else 'html', k)
+        lines.append("--b--")
+    elif shape == 'deep':
+        for k in range(n - 1):
+            lines.extend([f'Content-Type: multipart/mixed; boundary="b{k}"',
+                          "", f"--b{k}"])
+        leaf('html', n - 1)
+        lines.extend(f"--b{k}--" for k in reversed(range(n - 1)))
+    elif shape == 'alternatives':
+        lines.extend(['Content-Type: multipart/mixed; boundary="b"', ""])
+        alternatives = (n - 1) // 3
+        for k in range(1, 3 * alternatives, 3):
+            lines.extend(["--b", 'Content-Type: multipart/alternative; '
+                          f'boundary="b{k}"', "", f"--b{k}"])
+            leaf('plain', k + 1)
+            lines.append(f"--b{k}")
+            leaf('html', k + 2)
+            lines.append(f"--b{k}--")
+        for k in range(3 * alternatives + 1, n):
+            lines.append("--b")
+            leaf('plain', k)
+        lines.append("--b--")
+    else:
+        raise ValueError(f"Unknown shape '{shape}' requested.")
+    return ('\r\n'.join(lines) + '\r\n').encode()
+
+
+def tree(shape, n):
+    """Return a tree of n parts like message() would, without parsing
+
+    Parsing and generating messages is itself recursive in the email package,
+    so deep trees are built directly.
+    """
+
+    def leaf(subtype):
+        part = email.message.Message()
+        part['Content-Type'] = f"text/{subtype}"
+        part.set_payload("")
+        return part
+
+    def container(subtype, subparts):
+        part = email.message.Message()
+        part['Content-Type'] = f"multipart/{subtype}"
+        part.set_payload(subparts)
+        return part
+
+    if shape == 'wide':
+        return container('mixed', [leaf('plain') for k in range(n - 2)]
+                                  + [leaf('html')])
+    if shape == 'deep':
+        part = leaf('html')
+        for k in range(n - 1):
+            part = container('mixed', [part])
+        return part
+    if shape == 'alternatives':
+        return container('mixed', [
+            container('alternative', [leaf('plain'), leaf('html')])
+            for k in range((n - 1) // 3)]
+            + [leaf('plain') for k in range((n - 1) % 3)])
+    raise ValueError(f"Unknown shape '{shape}' requested.")
+
+
+def median_time(function, repeats=7):
+    times = []
+    gc.disable()  # collections would add noise proportional to the heap
+    try:
+        for k in range(repeats):
+            start = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return statistics.median(times)
+
+
+def fitted_exponent(sizes, times):
+    """Return the slope of the least-squares fit of log(times) to log(sizes)"""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(time) for time in times]
+    x_mean, y_mean = statistics.fmean(xs), statistics.fmean(ys)
+    return (sum((x - x_mean) * (y - y_mean) for x, y in zip(xs, ys))
+            / sum((x - x_mean) ** 2 for x in xs))
+
+
+def check_scaling(label, sizes, times, baselines=None):
+    """Raise an exception if the times do not scale linearly with the sizes
+
+    If linearly scaling baseline times are given, the times are judged
+    relative to those.
+    """
+    exponent = fitted_exponent(sizes, times)
+    if baselines:
+        exponent += 1 - fitted_exponent(sizes, baselines)
+    if exponent > MAX_EXPONENT:
+        raise Exception(f"{label}: the time grows as the number of parts to "
+                        f"the power {exponent:.2f}, which is not linear.")
+
+
+def benchmark_walk(sizes):
+    unlimited = {'max_depth': float('inf'), 'max_parts': float('inf')}
+    print(f"{'shape':<13} {'parts':>7} {'loop ms':>9} {'walk ms':>9} "
+          f"{'find ms':>9} {'msg.walk ms':>12}")
+    for shape in SHAPES:
+        loop_times = []
+        walk_times = []
+        for n in sizes:
+            msg = tree(shape, n)
+            parts = list(mime_walk.walk(msg, **unlimited))
+            loop_times.append(median_time(
+                lambda: sum(1 for part in parts if part.is_multipart())))
+            walk_times.append(median_time(
+                lambda: sum(1 for part in mime_walk.walk(msg, **unlimited))))
+            find_time = median_time(
+                lambda: mime_walk.find_first(msg, 'text/html', **unlimited))
+            try:
+                recursive = 1e3 * median_time(
+                    lambda: sum(1 for part in msg.walk()))
+                recursive = f"{recursive:>12.3f}"
+            except RecursionError:
+                recursive = f"{'recursion':>12}"
+            print(f"{shape:<13} {n:>7} {1e3 * loop_times[-1]:>9.3f} "
+                  f"{1e3 * walk_times[-1]:>9.3f} {1e3 * find_time:>9.3f} "
+                  f"{recursive}")
+        check_scaling(f"walking {shape} trees", sizes, walk_times,
+                      loop_times)
+
+
+def benchmark_filters(filters, sizes):
+    print(f"{'filter':<28} {'parts':>7} {'s':>9}")
+    for path in filters:
+        times = []
+        for n in sizes:
+            data = message('wide', n)
+            start = time.perf_counter()
+            subprocess.run([sys.executable, path], input=data, check=True,
+                           stdout=subprocess.DEVNULL)
+            times.append(time.perf_counter() - start)
+            print(f"{os.path.basename(path):<28} {n:>7} {times[-1]:>9.3f}")
+        check_scaling(os.path.basename(path), sizes, times)
+
+
+if __name__ == '__main__':
+    # Parse the arguments
+    argparser = argparse.ArgumentParser(
+        description="Generate pathological MIME messages or benchmark "
+                    "their traversal.")
+    argparser.add_argument('shape', nargs='?', choices=SHAPES)
+    argparser.add_argument('parts', nargs='?', type=int, metavar='N',
+                           help="number of parts")
+    argparser.add_argument('--benchmark', action='store_true',
+                           help="benchmark the traversal instead")
+    argparser.add_argument('--filter', action='append', default=[],
+                           dest='filters', metavar='NAME',
+                           help="filter to benchmark as well (repeatable)")
+    args = argparser.parse_args()
+
+    if args.benchmark:
+        benchmark_walk([2000, 4000, 8000, 16000, 32000])
+        filters = [name if os.path.exists(name) else os.path.join(HERE, name)
+                   for name in args.filters]
+        if filters:
+            benchmark_filters(filters, [250, 500, 1000, 2000, 4000])
+        sys.exit()
+
+    if args.shape is None or args.parts is None:
+        raise SyntaxError("A shape and a number of parts must be given.")
+    sys.stdout.buffer.write(message(args.shape, args.parts))
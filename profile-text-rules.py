@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+"""
+  profile-text-rules.py: A script that takes as arguments files or directories
+  (e.g., maildirs) of rfc822 compliant messages and applies the rules of the
+  text cleaning scripts (see text_cleaners.py) to their text/plain parts,
+  timing each rule separately. It gives as stdout-output a table or, with the
+  '--json' option, a JSON document with per rule the number of parts it was
+  tried on, the number of parts it matched, the total number of matches, the
+  number of parts it changed, its cumulative time, and the messages on which
+  it was slowest. The cleanup rules of html2alternative.py are also applied to
+  the text/plain parts, which for processed mail includes its output. Parts
+  that cannot be decoded, e.g., because of an unknown charset, are skipped
+  and counted.
+
+  Copyright (C) 2026 Erik Quaeghebeur
+
+  This program is free software: you can redistribute it and/or modify it under
+  the terms of the GNU General Public License as published by the Free Software
+  Foundation, either version 3 of the License, or (at your option) any later
+  version. This program is distributed in the hope that it will be useful, but
+  WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+  FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+  details. You should have received a copy of the GNU General Public License
+  along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import sys
+import os
+import argparse
+import heapq
+import json
+import time
+import email
+import email.policy
+import text_cleaners
+
+
+# Parse the arguments
+argparser = argparse.ArgumentParser(
+    description="Profile the rules of the text cleaning scripts on a corpus.")
+argparser.add_argument('paths', nargs='+', metavar='PATH',
+                       help="message file or directory of message files")
+argparser.add_argument('--json', action='store_true',
+                       help="output JSON instead of a table")
+argparser.add_argument('--slowest', type=int, default=3, metavar='N',
+                       help="number of slowest messages to list per rule")
+args = argparser.parse_args()
+
+# define email policy
+email_policy = email.policy.EmailPolicy(
+  max_line_length=None, linesep="\r\n", refold_source='none')
+
+
+def message_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        else:
+            yield path
+
+
+# Statistics per rule, in order of application
+stats = {}
+for ruleset, rules in text_cleaners.RULESETS.items():
+    for name, pattern, replacement in rules:
+        stats[(ruleset, name)] = {
+            'ruleset': ruleset, 'rule': name, 'pattern': pattern.pattern,
+            'parts': 0, 'hits': 0, 'matches': 0, 'changed': 0,
+            'seconds': 0.0, 'slowest': []}
+
+# Apply the rules to the text/plain parts of all messages
+messages = 0
+skipped = 0
+for path in message_files(args.paths):
+    with open(path, 'rb') as f:
+        msg = email.message_from_bytes(f.read(), policy=email_policy)
+    messages += 1
+    for part in msg.walk():
+        if part.get_content_type() != 'text/plain':
+            continue
+        flowed = part.get_param('format') == "flowed"
+        try:
+            original = part.get_content()
+        except LookupError:
+            skipped += 1  # unknown charset
+            continue
+        for ruleset, rules in text_cleaners.RULESETS.items():
+            # clean-line-endings.py leaves format=flowed parts alone
+            if flowed and ruleset == 'clean-line-endings':
+                continue
+            text = original
+            for name, pattern, replacement in rules:
+                start = time.perf_counter()
+                new, count = pattern.subn(replacement, text)
+                seconds = time.perf_counter() - start
+                rule = stats[(ruleset, name)]
+                rule['parts'] += 1
+                rule['matches'] += count
+                rule['seconds'] += seconds
+                if count:
+                    rule['hits'] += 1
+                if new != text:
+                    rule['changed'] += 1
+                # keep a min-heap of the slowest messages
+                if len(rule['slowest']) < args.slowest:
+                    heapq.heappush(rule['slowest'], (seconds, path))
+                elif args.slowest:
+                    heapq.heappushpop(rule['slowest'], (seconds, path))
+                text = new
+
+# Sort the slowest messages, slowest first
+for rule in stats.values():
+    rule['slowest'] = [{'seconds': seconds, 'path': path} for seconds, path
+                       in sorted(rule['slowest'], reverse=True)]
+
+# Send the report to stdout
+if args.json:
+    json.dump({'messages': messages, 'skipped_parts': skipped,
+               'rules': list(stats.values())},
+              sys.stdout, indent=2)
+    print()
+else:
+    header = (f"{'ruleset':<24} {'rule':<21} {'parts':>7} {'hits':>7} "
+              f"{'matches':>8} {'changed':>7} {'ms':>9} {'µs/part':>8}  "
+              f"slowest message")
+    print(f"{messages} messages, {skipped} undecodable parts skipped")
+    print(header)
+    print('-' * len(header))
+    for rule in stats.values():
+        mean = 1e6 * rule['seconds'] / rule['parts'] if rule['parts'] else 0
+        slowest = rule['slowest'][0]['path'] if rule['slowest'] else ''
+        print(f"{rule['ruleset']:<24} {rule['rule']:<21} {rule['parts']:>7} "
+              f"{rule['hits']:>7} {rule['matches']:>8} {rule['changed']:>7} "
+              f"{1e3 * rule['seconds']:>9.3f} {mean:>8.1f}  {slowest}")
@@ -0,0 +1,427 @@
+"""
+  quoted_html.py: A module for converting html with quoted thread history,
+  such as '<blockquote>', Gmail's 'gmail_quote' and Outlook's 'divRplyFwdMsg'
+  sections, to text using an html2text parser, while reusing the conversions
+  of quoted sections that were converted before, in this process or, if a
+  cache directory is given, in earlier ones.
+
+  A quoted section is converted by feeding it to the parser, which changes the
+  parser's state and output. Both are cached, keyed by a fingerprint of the
+  section and of the parser's state before it, so that for a section seen
+  before the cached output can be appended and the cached state restored
+  instead. Link numbers and blockquote prefixes are output between markers,
+  so that they can be shifted relative to the number of links and the
+  blockquote level before the section; the link numbers are only filled in
+  and the markers removed at the end, so that the result is identical to
+  converting the html in one go.
+
+  A cache directory holds an entry per section in JSON; the key of an entry
+  includes the html2text version and a fingerprint of the file defining the
+  parser's class, so that entries of other versions are not used. Only the
+  most recently used entries are kept, by default 10000.
+
+  Copyright (C) 2026 Erik Quaeghebeur
+
+  This program is free software: you can redistribute it and/or modify it under
+  the terms of the GNU General Public License as published by the Free Software
+  Foundation, either version 3 of the License, or (at your option) any later
+  version. This program is distributed in the hope that it will be useful, but
+  WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+  FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+  details. You should have received a copy of the GNU General Public License
+  along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import sys
+import os
+import re
+import hashlib
+import json
+import tempfile
+import html2text
+from html2text.elements import AnchorElement, ListElement
+from html2text.utils import pad_tables_in_text
+
+
+# Quoted sections smaller than this are not worth caching
+MIN_SECTION = 2048
+
+# Number of entries kept in a cache directory
+MAX_ENTRIES = 10000
+
+# Version of the format of the cache entries
+FORMAT = 1
+
+# Tokens relevant for finding the quoted sections
+token = re.compile(r'<!--.*?-->|<(/?)([a-zA-Z][\w:-]*)((?:"[^"]*"|\'[^\']*\'|'
+                   r'[^\'">])*)>', re.DOTALL)
+quote_marker = re.compile(r'(?i)\b(?:class\s*=\s*["\']?[^"\'>]*\bgmail_quote\b'
+                          r'|id\s*=\s*["\']?divRplyFwdMsg\b)')
+raw_text = {'script', 'style'}
+void = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+        'meta', 'param', 'source', 'track', 'wbr'}
+
+# Markers for link numbers and blockquote prefixes in the output
+link_number = re.compile('\x00(-?\\d+)\x00')
+level_marker = re.compile('\x01(>*)\x01')
+
+# Parser attributes that do not influence the output
+IRRELEVANT = {'outtextlist', 'out', 'lineno', 'offset',
+              '_HTMLParser__starttag_text'}
+
+
+class LinkCount(int):
+    # link numbers are output as markers, to be filled in at the end
+
+    def __add__(self, other):
+        return LinkCount(int(self) + other)
+
+    def __str__(self):
+        return f"\x00{int(self)}\x00"
+
+
+class BlockquoteLevel:
+    # blockquote prefixes ('>' * level) are output between markers, to be
+    # removed at the end; the lowest level reached is kept in a shared list
+
+    def __init__(self, level, lowest):
+        self.level = level
+        self.lowest = lowest
+        lowest[0] = min(lowest[0], level)
+
+    def __int__(self):
+        return self.level
+
+    def __add__(self, other):
+        return BlockquoteLevel(self.level + other, self.lowest)
+
+    def __sub__(self, other):
+        return BlockquoteLevel(self.level - other, self.lowest)
+
+    def __gt__(self, other):
+        return self.level > other
+
+    def __bool__(self):
+        return self.level != 0
+
+    def __rmul__(self, other):
+        if self.level <= 0:
+            return ''
+        return "\x01" + other * self.level + "\x01"
+
+
+def shift(text, links, levels):
+    """Shift the link numbers and blockquote levels in the text's markers
+
+    None is returned if a blockquote level would become negative.
+    """
+    text = link_number.sub(lambda match: f"\x00{int(match[1]) + links}\x00",
+                           text)
+    if levels < 0 and any(len(match[1]) < -levels
+                          for match in level_marker.finditer(text)):
+        return None
+    return level_marker.sub(
+        lambda match: "\x01" + ">" * (len(match[1]) + levels) + "\x01", text)
+
+
+def quoted_sections(html):
+    """Return the (start, end) spans of the quoted sections in the html
+
+    A blockquote or gmail_quote section runs up to the matching end tag, a
+    divRplyFwdMsg section (the header of the quoted message, which is
+    followed by the message itself) up to the end tag of its parent.
+    """
+    sections = []
+    stack = []  # (tag, start of the section or None, closes parent)
+    position = 0
+    while True:
+        match = token.search(html, position)
+        if match is None:
+            break
+        position = match.end()
+        closing, tag = match[1], (match[2] or '').lower()
+        if not tag:
+            continue  # a comment
+        if closing:
+            if not any(entry[0] == tag for entry in stack):
+                continue  # a stray end tag
+            while stack:
+                entry_tag, start, to_parent = stack.pop()
+                if start is not None:
+                    sections.append((start, match.end()))
+                if to_parent:
+                    sections.append((to_parent, match.start()))
+                if entry_tag == tag:
+                    break
+            continue
+        if tag in raw_text:
+            end = re.compile(rf'(?i)</{tag}\s*>').search(html, position)
+            position = end.end() if end else len(html)
+            continue
+        if tag in void or match[3].endswith('/'):
+            continue
+        start = None
+        if tag == 'blockquote' or quote_marker.search(match[3]):
+            if 'divrplyfwdmsg' in match[3].lower():
+                # the section continues up to the end of the parent
+                if not stack:
+                    sections.append((match.start(), len(html)))
+                elif stack[-1][2] is None:
+                    stack[-1] = stack[-1][:2] + (match.start(),)
+            else:
+                start = match.start()
+        stack.append((tag, start, None))
+    for entry_tag, start, to_parent in stack:
+        if start is not None:
+            sections.append((start, len(html)))
+        if to_parent:
+            sections.append((to_parent, len(html)))
+    return sorted(set(sections), key=lambda span: (span[0], -span[1]))
+
+
+def outermost(sections, start, end):
+    """Return the outermost sections within, but not equal to, start:end"""
+    spans = []
+    for span in sections:
+        if span[0] >= end:
+            break
+        if (span[0] >= start and span[1] <= end and span != (start, end)
+                and (not spans or span[0] >= spans[-1][1])):
+            spans.append(span)
+    return spans
+
+
+def encode(value):
+    """Return the value as JSON data, with what JSON lacks tagged
+
+    A TypeError is raised for values of other types than those found in the
+    state of an html2text parser.
+    """
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, list):
+        return [encode(item) for item in value]
+    if isinstance(value, tuple):
+        return {'tuple': [encode(item) for item in value]}
+    if isinstance(value, dict):
+        return {'dict': [[encode(key), encode(item)]
+                         for key, item in value.items()]}
+    if isinstance(value, re.Pattern) and isinstance(value.pattern, str):
+        return {'pattern': [value.pattern, value.flags]}
+    if isinstance(value, ListElement):
+        return {'list_element': [value.name, value.num]}
+    raise TypeError(f"Cannot encode a '{type(value).__name__}'.")
+
+
+def decode(data):
+    """Return the value encoded as JSON data by encode()"""
+    if isinstance(data, list):
+        return [decode(item) for item in data]
+    if not isinstance(data, dict):
+        return data
+    (tag, items), = data.items()
+    if tag == 'tuple':
+        return tuple(decode(item) for item in items)
+    if tag == 'dict':
+        return {decode(key): decode(item) for key, item in items}
+    if tag == 'pattern':
+        return re.compile(*items)
+    if tag == 'list_element':
+        return ListElement(*items)
+    raise ValueError(f"Unknown tag '{tag}'.")
+
+
+parser_versions = {}
+
+
+def parser_version(parser):
+    """Return a fingerprint of the code of the parser, html2text included"""
+    cls = type(parser)
+    if cls not in parser_versions:
+        fingerprint = hashlib.sha256(repr((FORMAT, html2text.__version__,
+                                           cls.__qualname__)).encode())
+        path = getattr(sys.modules.get(cls.__module__), '__file__', None)
+        if path:
+            with open(path, 'rb') as f:
+                fingerprint.update(f.read())
+        parser_versions[cls] = fingerprint.hexdigest()
+    return parser_versions[cls]
+
+
+class QuoteCache:
+    # in-memory cache, optionally backed by a directory with a JSON file per
+    # entry; entries are kept encoded, so that they are not changed by later
+    # use, and are loaded without executing anything
+
+    def __init__(self, directory=None, max_entries=MAX_ENTRIES):
+        self.entries = {}
+        self.directory = directory
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.added = 0
+
+    def get(self, key):
+        if key not in self.entries and self.directory:
+            path = os.path.join(self.directory, key)
+            try:
+                with open(path) as f:
+                    self.entries[key] = f.read()
+                os.utime(path)  # the modification time marks the last use
+            except (OSError, ValueError):
+                pass
+        if key not in self.entries:
+            return None
+        try:
+            output, state = decode(json.loads(self.entries[key]))
+        except (ValueError, TypeError, re.error):
+            return None  # corrupt or not written by this module
+        if not isinstance(output, str) or not isinstance(state, dict):
+            return None
+        return output, state
+
+    def put(self, key, entry):
+        self.entries[key] = json.dumps(encode(entry))
+        self.added += 1
+        if self.directory:
+            # written atomically, as several processes may share the directory
+            os.makedirs(self.directory, exist_ok=True)
+            f = tempfile.NamedTemporaryFile('w', dir=self.directory,
+                                            prefix='.', delete=False)
+            with f:
+                f.write(self.entries[key])
+            os.replace(f.name, os.path.join(self.directory, key))
+
+    def prune(self):
+        """Remove all but the most recently used entries from the directory"""
+        if not self.directory or not self.added:
+            return
+        used = []
+        for name in os.listdir(self.directory):
+            if name.startswith('.'):
+                continue  # being written
+            path = os.path.join(self.directory, name)
+            try:
+                used.append((os.stat(path).st_mtime, path))
+            except FileNotFoundError:
+                pass
+        used.sort(reverse=True)
+        for mtime, path in used[self.max_entries:]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # removed by another process in the meantime
+
+
+def parser_state(parser, links, outcount, level):
+    """Return the state of the parser relevant for its further output
+
+    Link numbers, output counts and blockquote levels are made relative to
+    the given ones; None is returned if the state cannot be captured.
+    """
+    if parser.rawdata or parser.cdata_elem:
+        return None  # in the middle of a construct
+    if parser.outtextlist and parser.outtextlist[-1] == "[":
+        return None  # the parser may want to take back this output
+    state = {}
+    for name, value in vars(parser).items():
+        if name in IRRELEVANT:
+            continue
+        if isinstance(value, str):
+            value = shift(value, -links, -level)
+            if value is None:
+                return None
+        state[name] = value
+    state['acount'] = int(parser.acount) - links
+    state['outcount'] = parser.outcount - outcount
+    state['blockquote'] = int(parser.blockquote) - level
+    state['a'] = [(link.attrs, int(link.count) - links,
+                   link.outcount - outcount) for link in parser.a]
+    # only the last character of the preceding data is ever looked at
+    state['preceding_data'] = parser.preceding_data[-1:]
+    return dict(sorted(state.items()))
+
+
+def restore_state(parser, state, links, outcount, level):
+    lowest = parser.blockquote.lowest
+    for name, value in state.items():
+        if isinstance(value, str):
+            value = shift(value, links, level)
+        setattr(parser, name, value)
+    parser.acount = LinkCount(links + state['acount'])
+    parser.outcount = outcount + state['outcount']
+    parser.blockquote = BlockquoteLevel(level + state['blockquote'], lowest)
+    parser.a = [AnchorElement(attrs, LinkCount(links + count), outcount + delta)
+                for attrs, count, delta in state['a']]
+
+
+def feed(parser, html, start, end, sections, cache):
+    """Feed html[start:end] to the parser, reusing cached quoted sections"""
+    position = start
+    for section_start, section_end in outermost(sections, start, end):
+        if section_end - section_start < MIN_SECTION:
+            continue
+        parser.feed(html[position:section_start])
+        position = section_end
+        links, outcount = int(parser.acount), parser.outcount
+        level = int(parser.blockquote)
+        state = parser_state(parser, links, outcount, level)
+        if state is None or level < 0:
+            # negative levels (by stray end tags) produce no markers
+            feed(parser, html, section_start, section_end, sections, cache)
+            continue
+        # the output inside the section depends on whether it is quoted
+        try:
+            fingerprint = json.dumps(encode(
+                [parser_version(parser), level > 0, state]))
+        except TypeError:
+            # the state contains something that cannot be cached
+            feed(parser, html, section_start, section_end, sections, cache)
+            continue
+        key = hashlib.sha256(
+            html[section_start:section_end].encode(errors='surrogatepass')
+            + fingerprint.encode(errors='surrogatepass')).hexdigest()
+        entry = cache.get(key)
+        if entry is not None:
+            cache.hits += 1
+            output, state_after = entry
+            parser.outtextlist.append(shift(output, links, level))
+            restore_state(parser, state_after, links, outcount, level)
+            continue
+        cache.misses += 1
+        mark = len(parser.outtextlist)
+        lowest = parser.blockquote.lowest
+        outer_lowest, lowest[0] = lowest[0], level
+        feed(parser, html, section_start, section_end, sections, cache)
+        # sections that leave their blockquote level cannot be shifted
+        reusable = lowest[0] >= level
+        lowest[0] = min(outer_lowest, lowest[0])
+        if not reusable:
+            continue
+        state_after = parser_state(parser, links, outcount, level)
+        output = shift(''.join(parser.outtextlist[mark:]), -links, -level)
+        if state_after is not None and output is not None:
+            try:
+                cache.put(key, (output, state_after))
+            except TypeError:
+                pass  # the state contains something that cannot be cached
+    parser.feed(html[position:end])
+
+
+def convert(parser, html, cache):
+    """Convert the html to text like parser.handle(html) would"""
+    if '\x00' in html or '\x01' in html:
+        return parser.handle(html)  # would clash with the markers
+    parser.start = True
+    parser.acount = LinkCount(parser.acount)
+    parser.blockquote = BlockquoteLevel(parser.blockquote, [0])
+    feed(parser, html, 0, len(html), quoted_sections(html), cache)
+    cache.prune()
+    parser.feed("")
+    text = parser.finish()
+    text = link_number.sub(lambda match: match[1], text)
+    text = text.replace('\x01', '')
+    text = parser.optwrap(text)
+    if parser.pad_tables:
+        text = pad_tables_in_text(text)
+    return text
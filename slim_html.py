@@ -0,0 +1,133 @@
+"""
+  slim_html.py: A module with a function that removes constructs from html
+  that do not contribute to its conversion to text, such as style blocks,
+  inline 'data:' images, tracking pixels, hidden preheaders, and MSO
+  conditional comments. It is meant to be applied to the html before handing
+  it to a converter, which then has less to parse. If the environment variable
+  MAILFILTERS_SLIM_REPORT is set, report() logs the bytes removed to stderr.
+
+  Copyright (C) 2026 Erik Quaeghebeur
+
+  This program is free software: you can redistribute it and/or modify it under
+  the terms of the GNU General Public License as published by the Free Software
+  Foundation, either version 3 of the License, or (at your option) any later
+  version. This program is distributed in the hope that it will be useful, but
+  WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+  FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+  details. You should have received a copy of the GNU General Public License
+  along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import sys
+import os
+import re
+
+
+# Custom replacement functions
+
+def drop_tracking_pixel(match):
+    # only images of at most 1×1 pixels without alt text are dropped
+    tag = match[0]
+    alt = re.search(r'(?i)\balt\s*=\s*(["\'])(.*?)\1', tag)
+    if alt and alt[2].strip():
+        return tag
+    sizes = re.findall(r'(?i)\b(?:width|height)\s*[=:]\s*["\']?\s*(\d+)', tag)
+    if len(sizes) >= 2 and all(int(size) <= 1 for size in sizes):
+        return ''
+    return tag
+
+
+# Hidden elements are only dropped as preheaders if no text precedes them in
+# this many characters after the start of the body
+PREHEADER_WINDOW = 8192
+
+
+def drop_hidden_preheaders(hidden):
+    """Return a replacement function for the hidden elements matched by the
+    pattern hidden that drops those without visible text before them"""
+    last = {'html': None, 'body': 0, 'visible': None}
+
+    def drop(match):
+        html, start = match.string, match.start()
+        if html is not last['html']:
+            # once per html string: where the body starts and, once found,
+            # where the first visible text is
+            body = re.search(r'(?i)<body\b', html)
+            last.update(html=html, body=body.start() if body else 0,
+                        visible=None)
+        body = last['body'] if last['body'] <= start else 0
+        if start - body > PREHEADER_WINDOW:
+            return match[0]
+        if last['visible'] is not None and start > last['visible']:
+            return match[0]
+        before = hidden.sub('', html[body:start])  # earlier hidden elements
+        before = re.sub(r'(?s)<!--.*?-->|<[^>]*>', '', before)
+        before = re.sub(r'(?i)&(?:nbsp|zwnj|#8203|#847|#160);', '', before)
+        if before.strip():
+            last['visible'] = start
+            return match[0]
+        return ''
+
+    return drop
+
+
+# Small hidden elements with text only, as preheaders are
+HIDDEN_ELEMENT = re.compile(r'(?is)<(div|span)\b[^>]*\bstyle\s*=\s*(["\'])'
+                            r'(?:(?!\2)[^>])*?display\s*:\s*none[^>]*>'
+                            r'[^<]{0,500}</\1\s*>')
+
+
+# Slimming rules: name, lowercase needle that must be present for the rule to
+# be tried, pattern, and replacement; they are applied in order
+SLIMMING_RULES = [
+    ('style', '<style',
+     re.compile(r'(?is)<style\b[^>]*>.*?</style\s*>'), ''),
+    ('script', '<script',
+     re.compile(r'(?is)<script\b[^>]*>.*?</script\s*>'), ''),
+    # conditional comments are removed up to the first '-->', where they end
+    # for the converter as well; so only the comments themselves of
+    # downlevel-revealed ones ('<!--[if !mso]><!-- -->') are removed
+    ('mso_conditional', '<!--[if',
+     re.compile(r'(?is)<!--\[if\b.*?-->|<!--<!\[endif\]-->'), ''),
+    ('data_uri', 'data:',
+     re.compile(r'(?i)(\b(?:src|href)\s*=\s*["\']?)'
+                r'data:[\w/+.-]+;base64,[\w+/=-]*'), r'\1data:'),
+    ('tracking_pixel', '<img',
+     re.compile(r'(?i)<img\b[^>]*>'), drop_tracking_pixel),
+    ('hidden_preheader', 'display',
+     HIDDEN_ELEMENT, drop_hidden_preheaders(HIDDEN_ELEMENT)),
+]
+
+
+def slim(html, rules=SLIMMING_RULES):
+    """Return the slimmed html and the number of bytes removed per rule"""
+    lowered = html.lower()
+    removed = {}
+    for name, needle, pattern, replacement in rules:
+        if needle not in lowered:
+            continue
+        count = 0
+
+        def replace(match):
+            nonlocal count
+            if callable(replacement):
+                new = replacement(match)
+            else:
+                new = match.expand(replacement)
+            count += (len(match[0].encode(errors='surrogatepass'))
+                      - len(new.encode(errors='surrogatepass')))
+            return new
+
+        html = pattern.sub(replace, html)
+        if count:
+            removed[name] = count
+    return html, removed
+
+
+def report(removed):
+    """Log the bytes removed per rule to stderr, if MAILFILTERS_SLIM_REPORT"""
+    if removed and os.environ.get('MAILFILTERS_SLIM_REPORT'):
+        details = ', '.join(f"{name}: {count}"
+                            for name, count in removed.items())
+        print(f"slim_html removed {sum(removed.values())} bytes ({details})",
+              file=sys.stderr)
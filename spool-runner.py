@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+
+"""
+  spool-runner.py: A script that drains a spool directory of rfc822 compliant
+  messages by passing each of them through a chain of the filter scripts in
+  this directory (or other executables that read a message from stdin and
+  write one to stdout; Python scripts are run with the interpreter running
+  this script). Several workers, possibly on several hosts sharing the spool
+  directory, can run at the same time. The spool directory contains:
+
+    queue/       messages waiting to be filtered
+    claimed/     messages being filtered, renamed to 'name@host.pid@time'
+    tmp/         filter output being written
+    outbox/      filtered messages
+    quarantine/  messages for which a filter failed, with a '.err' file
+    stats/       throughput statistics per worker, as JSON
+
+  Messages are claimed by renaming them from queue/ to claimed/, which only
+  one worker can do successfully; the claim time is part of the new name.
+  Each worker lists the queue once per batch, in its own random order, so
+  that workers rarely compete for the same message. Claims of workers that
+  are no longer running on this host, or that are older than the '--stale'
+  time, are returned to the queue. Messages for which a filter runs longer
+  than the '--timeout' time are quarantined. With '--stats', the statistics
+  of all workers are shown instead.
+
+  Copyright (C) 2026 Erik Quaeghebeur
+
+  This program is free software: you can redistribute it and/or modify it under
+  the terms of the GNU General Public License as published by the Free Software
+  Foundation, either version 3 of the License, or (at your option) any later
+  version. This program is distributed in the hope that it will be useful, but
+  WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+  FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+  details. You should have received a copy of the GNU General Public License
+  along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import sys
+import os
+import argparse
+import json
+import multiprocessing
+import random
+import socket
+import subprocess
+import time
+
+
+SUBDIRS = ['queue', 'claimed', 'tmp', 'outbox', 'quarantine', 'stats']
+HERE = os.path.dirname(os.path.realpath(__file__))
+
+
+def resolve_filter(name):
+    """Return the path of a filter, looked up in this directory if relative"""
+    if os.path.isabs(name) or os.path.exists(name):
+        return name
+    path = os.path.join(HERE, name)
+    if not os.path.exists(path):
+        raise ValueError(f"Unknown filter '{name}'.")
+    return path
+
+
+def pid_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def recover_claims(spool, stale):
+    """Return messages claimed by crashed or stale workers to the queue"""
+    claimed = os.path.join(spool, 'claimed')
+    host = socket.gethostname()
+    recovered = 0
+    for entry in os.listdir(claimed):
+        claim_name, _, claimed_at = entry.rpartition('@')
+        name, _, owner = claim_name.rpartition('@')
+        owner_host, _, owner_pid = owner.rpartition('.')
+        path = os.path.join(claimed, entry)
+        try:
+            age = time.time() - float(claimed_at)
+        except ValueError:
+            continue  # not a claim
+        crashed = (owner_host == host and owner_pid.isdigit()
+                   and not pid_running(int(owner_pid)))
+        if not name or not (crashed or age > stale):
+            continue
+        try:
+            os.rename(path, os.path.join(spool, 'queue', name))
+            recovered += 1
+        except FileNotFoundError:
+            pass  # recovered or finished by another worker in the meantime
+    return recovered
+
+
+def queued(spool):
+    """Return the names of the queued messages, in random order"""
+    names = [name for name in os.listdir(os.path.join(spool, 'queue'))
+             if not name.startswith('.')]
+    random.shuffle(names)
+    return names
+
+
+def claim(spool, worker, names):
+    """Claim a message from the queue, trying the given names in turn
+
+    Return its name and claimed path; the names tried are removed.
+    """
+    queue = os.path.join(spool, 'queue')
+    while names:
+        name = names.pop()
+        # the claim time is used to detect stale claims
+        path = os.path.join(spool, 'claimed',
+                            f"{name}@{worker}@{time.time():.3f}")
+        try:
+            os.rename(os.path.join(queue, name), path)
+        except FileNotFoundError:
+            continue  # claimed by another worker
+        return name, path
+    return None, None
+
+
+def run_filters(filters, message, timeout):
+    """Pass the message through the filters; return output and error text"""
+    for path in filters:
+        if os.path.realpath(path).endswith('.py'):
+            command = [sys.executable, path]
+        else:
+            command = [path]
+        try:
+            process = subprocess.run(command, input=message,
+                                     stdout=subprocess.PIPE,
+                                     stderr=subprocess.PIPE, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return None, (f"{os.path.basename(path)} timed out after "
+                          f"{timeout} seconds.")
+        if process.returncode != 0:
+            error = process.stderr.decode(errors='replace')
+            return None, f"{os.path.basename(path)} failed:\n{error}"
+        message = process.stdout
+    return message, None
+
+
+def write_stats(spool, worker, stats):
+    path = os.path.join(spool, 'stats', f"{worker}.json")
+    with open(path + '.tmp', 'w') as f:
+        json.dump(stats, f)
+    os.replace(path + '.tmp', path)
+
+
+def work(spool, filters, poll, stale, timeout):
+    """Filter messages until the queue is empty (and, if polling, forever)"""
+    worker = f"{socket.gethostname()}.{os.getpid()}"
+    stats = {'worker': worker, 'started': time.time(), 'processed': 0,
+             'failed': 0, 'bytes_in': 0, 'bytes_out': 0, 'busy': 0.0}
+    write_stats(spool, worker, stats)
+    names = []  # the current batch of queued messages
+    while True:
+        name, path = claim(spool, worker, names)
+        if name is None:
+            names = queued(spool)
+            if names:
+                continue
+            if recover_claims(spool, stale):
+                continue
+            if poll is None:
+                break
+            time.sleep(poll)
+            continue
+        start = time.perf_counter()
+        try:
+            with open(path, 'rb') as f:
+                message = f.read()
+        except FileNotFoundError:
+            continue  # returned to the queue as stale in the meantime
+        output, error = run_filters(filters, message, timeout)
+        if error is None:
+            tmp = os.path.join(spool, 'tmp', f"{name}@{worker}")
+            with open(tmp, 'wb') as f:
+                f.write(output)
+            os.replace(tmp, os.path.join(spool, 'outbox', name))
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # returned to the queue as stale in the meantime
+            stats['processed'] += 1
+            stats['bytes_out'] += len(output)
+        else:
+            quarantined = os.path.join(spool, 'quarantine', name)
+            try:
+                os.replace(path, quarantined)
+            except FileNotFoundError:
+                continue  # returned to the queue as stale in the meantime
+            with open(quarantined + '.err', 'w') as f:
+                f.write(error)
+            stats['failed'] += 1
+        stats['bytes_in'] += len(message)
+        stats['busy'] += time.perf_counter() - start
+        stats['updated'] = time.time()
+        write_stats(spool, worker, stats)
+    stats['finished'] = time.time()
+    write_stats(spool, worker, stats)
+
+
+def show_stats(spool):
+    directory = os.path.join(spool, 'stats')
+    print(f"{'worker':<32} {'processed':>9} {'failed':>6} {'MB in':>8} "
+          f"{'busy s':>8} {'msg/s':>7}")
+    for entry in sorted(os.listdir(directory)):
+        if not entry.endswith('.json'):
+            continue
+        with open(os.path.join(directory, entry)) as f:
+            stats = json.load(f)
+        handled = stats['processed'] + stats['failed']
+        rate = handled / stats['busy'] if stats['busy'] else 0
+        print(f"{stats['worker']:<32} {stats['processed']:>9} "
+              f"{stats['failed']:>6} {stats['bytes_in'] / 1e6:>8.2f} "
+              f"{stats['busy']:>8.2f} {rate:>7.1f}")
+
+
+if __name__ == '__main__':
+    # Parse the arguments
+    argparser = argparse.ArgumentParser(
+        description="Filter the messages in a spool directory.")
+    argparser.add_argument('spool', metavar='SPOOL', help="spool directory")
+    argparser.add_argument('--filter', action='append', default=[],
+                           dest='filters', metavar='NAME',
+                           help="filter to apply, in order (repeatable)")
+    argparser.add_argument('--workers', type=int, default=1, metavar='N',
+                           help="number of worker processes to start")
+    argparser.add_argument('--poll', type=float, default=None,
+                           metavar='SECONDS',
+                           help="keep polling the queue at this interval")
+    argparser.add_argument('--stale', type=float, default=3600,
+                           metavar='SECONDS',
+                           help="age after which claims are returned")
+    argparser.add_argument('--timeout', type=float, default=600,
+                           metavar='SECONDS',
+                           help="time after which a filter is stopped")
+    argparser.add_argument('--stats', action='store_true',
+                           help="show the statistics of all workers")
+    args = argparser.parse_args()
+
+    # Prepare the spool directory
+    for subdir in SUBDIRS:
+        os.makedirs(os.path.join(args.spool, subdir), exist_ok=True)
+
+    if args.stats:
+        show_stats(args.spool)
+        sys.exit()
+
+    if not args.filters:
+        raise SyntaxError("At least one filter must be given.")
+    filters = [resolve_filter(name) for name in args.filters]
+
+    # Start the workers and wait for them to finish
+    workers = [multiprocessing.Process(
+                   target=work,
+                   args=(args.spool, filters, args.poll, args.stale,
+                         args.timeout))
+               for k in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if any(worker.exitcode != 0 for worker in workers):
+        raise Exception("A worker failed.")
@@ -0,0 +1,89 @@
+"""
+  test_html2alternative.py: Tests of the fixes html2alternative.py applies to
+  the html while converting it to text, run on the script as a filter.
+
+  Copyright (C) 2026 Erik Quaeghebeur
+
+  This program is free software: you can redistribute it and/or modify it under
+  the terms of the GNU General Public License as published by the Free Software
+  Foundation, either version 3 of the License, or (at your option) any later
+  version. This program is distributed in the hope that it will be useful, but
+  WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+  FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+  details. You should have received a copy of the GNU General Public License
+  along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import sys
+import os
+import subprocess
+import unittest
+import email
+import email.policy
+
+
+SCRIPT = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                      'html2alternative.py')
+
+
+def convert(html):
+    """Return the text/plain part html2alternative.py makes for the html"""
+    message = ("From: a@example.org\r\nMIME-Version: 1.0\r\n"
+               "Content-Type: text/html; charset=utf-8\r\n\r\n" + html)
+    env = dict(os.environ)
+    env.pop('MAILFILTERS_QUOTE_CACHE', None)
+    process = subprocess.run([sys.executable, SCRIPT],
+                             input=message.encode(), stdout=subprocess.PIPE,
+                             env=env, check=True)
+    msg = email.message_from_bytes(process.stdout, policy=email.policy.default)
+    for part in msg.walk():
+        if part.get_content_type() == 'text/plain':
+            return part.get_content().replace('\r\n', '\n')
+    raise ValueError("No 'text/plain' part generated.")
+
+
+class TestFixes(unittest.TestCase):
+
+    def test_whitespace_out_of_emphasis(self):
+        self.assertIn("Hello *bold* world", convert("Hello <b> bold</b> world"))
+        self.assertIn("Hello *bold* world", convert("Hello <b>bold </b> world"))
+        self.assertIn("Hello *bold* world", convert("Hello<b> bold</b> world"))
+        self.assertIn("x /*y*/ z", convert("x <i> <b>y</b></i> z"))
+
+    def test_anchor_collapsing(self):
+        text = convert('<a href="https://x.org/a">https://x.org/a</a> x')
+        self.assertIn("https://x.org/a x", text)
+        self.assertNotIn("[", text)
+        text = convert('See <a href="https://x.org/a"> https://x.org/a </a> '
+                       'now')
+        self.assertIn("See https://x.org/a now", text)
+        self.assertIn("http://e.com y",
+                      convert('<a href="http://e.com"> </a> y'))
+
+    def test_mailto_collapsing(self):
+        text = convert('<a href="mailto:me@x.org">me@x.org</a> x')
+        self.assertIn("me@x.org x", text)
+        self.assertNotIn("mailto:", text)
+
+    def test_anchor_kept(self):
+        text = convert('<a href="https://x.org/b">link</a> x')
+        self.assertIn("[link][1] x", text)
+        self.assertIn("[1]: https://x.org/b", text)
+
+    def test_double_escaped_ampersands(self):
+        text = convert('<a href="https://x.org/?a=1&amp;amp;b=2">link</a> and '
+                       'Tom &amp;amp; Jerry')
+        self.assertIn("Tom & Jerry", text)
+        self.assertIn("https://x.org/?a=1&b=2", text)
+        self.assertNotIn("&amp;", text)
+
+    def test_no_escapes(self):
+        text = convert("<p>1. item - x</p><p>-- <br>Sig. 2.</p>")
+        self.assertIn("1. item - x", text)
+        self.assertIn("Sig. 2.", text)
+        self.assertNotIn("\\-", text)
+        self.assertNotIn("\\.", text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+"""
+  test_quoted_html.py: Tests checking that converting html with quoted thread
+  history using quoted_html.py, with a fresh and with a warm cache, gives the
+  same text as converting it with html2text in one go.
+
+  Copyright (C) 2026 Erik Quaeghebeur
+
+  This program is free software: you can redistribute it and/or modify it under
+  the terms of the GNU General Public License as published by the Free Software
+  Foundation, either version 3 of the License, or (at your option) any later
+  version. This program is distributed in the hope that it will be useful, but
+  WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+  FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+  details. You should have received a copy of the GNU General Public License
+  along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import sys
+import os
+import subprocess
+import tempfile
+import unittest
+import email
+import email.policy
+import html2text
+import quoted_html
+
+
+SCRIPT = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                      'html2alternative.py')
+
+
+def make_parser(links_each_paragraph):
+    parser = html2text.HTML2Text()
+    parser.body_width = 0
+    parser.links_each_paragraph = links_each_paragraph
+    parser.unicode_snob = True
+    parser.inline_links = False
+    parser.ignore_tables = True
+    parser.use_automatic_links = True
+    return parser
+
+
+def body(k):
+    """Return the html of the new text of the k-th message of a thread"""
+    return (f'<p>Reply {k}, see <a href="https://example.org/{k}">the '
+            f'page</a> and <a href="https://example.org/shared">the shared '
+            f'one</a>.</p><p><b>Point</b> {k}: <i>details</i><br>more '
+            f'text<br>- a list-like line</p>' * 3)
+
+
+def thread(kind, length):
+    """Return the html of each message of a thread, each quoting the previous
+
+    The blockquote threads nest the history in plain blockquotes, the
+    gmail_quote and divRplyFwdMsg ones quote like Gmail and Outlook do.
+    """
+    messages = []
+    history = ''
+    for k in range(length):
+        new = body(k)
+        if not history:
+            history = f'<div>{new}</div>'
+        elif kind == 'blockquote':
+            history = (f'<div>{new}</div><p>Someone wrote:</p>'
+                       f'<blockquote>{history}</blockquote>')
+        elif kind == 'gmail_quote':
+            history = (f'<div dir="ltr">{new}</div><br><div class="gmail_quote">'
+                       f'<div class="gmail_attr">On day {k}, someone wrote:<br>'
+                       f'</div><blockquote class="gmail_quote">{history}'
+                       f'</blockquote></div>')
+        elif kind == 'divRplyFwdMsg':
+            history = (f'<div>{new}</div><hr><div id="divRplyFwdMsg"><b>From:'
+                       f'</b> Someone<br><b>Sent:</b> day {k}<br></div>'
+                       f'<div>{history}</div>')
+        messages.append(f'<html><body>{history}</body></html>')
+    return messages
+
+
+THREADS = {kind: thread(kind, 6)
+           for kind in ['blockquote', 'gmail_quote', 'divRplyFwdMsg']}
+# a stray end tag before the history, as found in real messages
+THREADS['stray'] = [message.replace('<body>', '<body><p>x</p></blockquote>')
+                    for message in THREADS['blockquote']]
+
+
+class TestConvert(unittest.TestCase):
+
+    def setUp(self):
+        self.min_section = quoted_html.MIN_SECTION
+        quoted_html.MIN_SECTION = 0
+
+    def tearDown(self):
+        quoted_html.MIN_SECTION = self.min_section
+
+    def check(self, messages, cache, links_each_paragraph):
+        for html in messages:
+            self.assertEqual(
+                quoted_html.convert(make_parser(links_each_paragraph), html,
+                                    cache),
+                make_parser(links_each_paragraph).handle(html))
+
+    def test_threads(self):
+        for kind, messages in THREADS.items():
+            for links_each_paragraph in [False, True]:
+                with self.subTest(kind=kind,
+                                  links_each_paragraph=links_each_paragraph):
+                    cache = quoted_html.QuoteCache()
+                    self.check(messages, cache, links_each_paragraph)
+                    hits = cache.hits
+                    if links_each_paragraph:
+                        # otherwise, the links still to be listed at the end
+                        # differ between the messages
+                        self.assertGreater(hits, 0)
+                    self.check(messages, cache, links_each_paragraph)
+                    self.assertGreater(cache.hits, hits)
+
+    def test_cache_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for attempt in ['fresh', 'warm']:
+                with self.subTest(attempt=attempt):
+                    cache = quoted_html.QuoteCache(directory)
+                    self.check(THREADS['gmail_quote'], cache, True)
+                    if attempt == 'warm':
+                        self.assertEqual(cache.misses, 0)
+                    self.assertTrue(os.listdir(directory))
+
+    def test_corrupt_cache_entries(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.check(THREADS['divRplyFwdMsg'],
+                       quoted_html.QuoteCache(directory), False)
+            for name in os.listdir(directory):
+                with open(os.path.join(directory, name), 'w') as f:
+                    f.write('{"dict": [["not", "a state"]]}')
+            self.check(THREADS['divRplyFwdMsg'],
+                       quoted_html.QuoteCache(directory), False)
+
+
+def convert(html, cache_directory):
+    """Return the text/plain part html2alternative.py makes for the html"""
+    message = ("From: a@example.org\r\nMIME-Version: 1.0\r\n"
+               "Content-Type: text/html; charset=utf-8\r\n\r\n" + html)
+    env = dict(os.environ)
+    env.pop('MAILFILTERS_QUOTE_CACHE', None)
+    if cache_directory:
+        env['MAILFILTERS_QUOTE_CACHE'] = cache_directory
+    process = subprocess.run([sys.executable, SCRIPT],
+                             input=message.encode(), stdout=subprocess.PIPE,
+                             env=env, check=True)
+    msg = email.message_from_bytes(process.stdout, policy=email.policy.default)
+    for part in msg.walk():
+        if part.get_content_type() == 'text/plain':
+            return part.get_content()
+    raise ValueError("No 'text/plain' part generated.")
+
+
+class TestHTML2Alternative(unittest.TestCase):
+
+    def test_quote_cache(self):
+        html = thread('gmail_quote', 8)[-1]
+        plain = convert(html, None)
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(convert(html, directory), plain)
+            self.assertTrue(os.listdir(directory))
+            self.assertEqual(convert(html, directory), plain)
+
+
+if __name__ == '__main__':
+    unittest.main()
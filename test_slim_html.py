@@ -0,0 +1,91 @@
+"""
+  test_slim_html.py: Tests of the slimming rules of slim_html.py, checking
+  that they remove what does not contribute to the text and keep what does.
+
+  Copyright (C) 2026 Erik Quaeghebeur
+
+  This program is free software: you can redistribute it and/or modify it under
+  the terms of the GNU General Public License as published by the Free Software
+  Foundation, either version 3 of the License, or (at your option) any later
+  version. This program is distributed in the hope that it will be useful, but
+  WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+  FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+  details. You should have received a copy of the GNU General Public License
+  along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import slim_html
+
+
+def slim(html):
+    return slim_html.slim(html)[0]
+
+
+class TestSlimmingRules(unittest.TestCase):
+
+    def test_style_and_script(self):
+        self.assertEqual(slim('<style>p {color: red}</style><p>a</p>'
+                              '<script>x()</script>'), '<p>a</p>')
+
+    def test_preheader_dropped(self):
+        html = ('<html><head></head><body>'
+                '<div style="display:none">Our preheader</div>'
+                '<span style="display: none;">&zwnj;&nbsp;&zwnj;</span>'
+                '<p>Hello</p></body></html>')
+        self.assertEqual(slim(html),
+                         '<html><head></head><body><p>Hello</p></body></html>')
+
+    def test_mobile_only_block_kept(self):
+        html = ('<body><p>Hello</p>'
+                '<div class="mobile" style="display:none">Call us</div>'
+                '<p>Bye</p></body>')
+        self.assertEqual(slim(html), html)
+
+    def test_hidden_element_with_markup_kept(self):
+        html = ('<body><div style="display:none"><a href="https://x.org">'
+                'mobile menu</a></div><p>Hello</p></body>')
+        self.assertEqual(slim(html), html)
+
+    def test_downlevel_revealed_mso_kept(self):
+        for opening in ['<!--[if !mso]><!-->', '<!--[if !mso]><!-- -->']:
+            with self.subTest(opening=opening):
+                self.assertEqual(
+                    slim(f'<p>a</p>{opening}<p>VISIBLE</p><!--<![endif]-->'
+                         '<p>b</p>'), '<p>a</p><p>VISIBLE</p><p>b</p>')
+
+    def test_downlevel_hidden_mso_dropped(self):
+        self.assertEqual(slim('<p>a</p><!--[if mso]><table><tr><td>'
+                              '</td></tr></table><![endif]--><p>b</p>'),
+                         '<p>a</p><p>b</p>')
+
+    def test_tracking_pixel(self):
+        self.assertEqual(slim('<p>a<img src="https://t.example/p.gif" '
+                              'width="1" height="1"></p>'), '<p>a</p>')
+        self.assertEqual(slim('<p>a<img src="x.gif" style="width:1px; '
+                              'height:0px" alt=""></p>'), '<p>a</p>')
+
+    def test_small_image_with_alt_text_kept(self):
+        html = '<p>a<img src="dot.gif" width="1" height="1" alt="•"></p>'
+        self.assertEqual(slim(html), html)
+
+    def test_data_uri(self):
+        self.assertEqual(slim('<img src="data:image/png;base64,iVBORw0KGgo=" '
+                              'alt="logo">'), '<img src="data:" alt="logo">')
+        text = '<p>see data:text/plain;base64,SGVsbG8= and more words.</p>'
+        self.assertEqual(slim(text), text)
+
+    def test_removed_bytes(self):
+        html, removed = slim_html.slim('<style>p {}</style><p>é</p>')
+        self.assertEqual(removed, {'style': len('<style>p {}</style>')})
+
+    def test_custom_rules(self):
+        rules = [rule for rule in slim_html.SLIMMING_RULES
+                 if rule[0] == 'hidden_preheader']
+        html = '<body><div style="display:none">Pre</div><p>Hi</p></body>'
+        self.assertEqual(slim_html.slim(html, rules)[0],
+                         '<body><p>Hi</p></body>')
+
+
+if __name__ == '__main__':
+    unittest.main()
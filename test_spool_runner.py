@@ -0,0 +1,125 @@
+"""
+  test_spool_runner.py: Tests of spool-runner.py, run on a temporary spool
+  directory with several workers, a filter that fails or hangs on some
+  messages, and a claim left behind by a crashed worker.
+
+  Copyright (C) 2026 Erik Quaeghebeur
+
+  This program is free software: you can redistribute it and/or modify it under
+  the terms of the GNU General Public License as published by the Free Software
+  Foundation, either version 3 of the License, or (at your option) any later
+  version. This program is distributed in the hope that it will be useful, but
+  WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+  FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+  details. You should have received a copy of the GNU General Public License
+  along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import sys
+import os
+import json
+import socket
+import subprocess
+import tempfile
+import time
+import unittest
+
+
+SCRIPT = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                      'spool-runner.py')
+
+FILTER = """\
+import sys
+import time
+message = sys.stdin.buffer.read()
+if b'FAIL' in message:
+    sys.exit("failing as asked")
+if b'HANG' in message:
+    time.sleep(60)
+sys.stdout.buffer.write(b'X-Filtered: yes\\r\\n' + message)
+"""
+
+
+def dead_pid():
+    """Return the pid of a process that has finished"""
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+class TestSpoolRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.spool = os.path.join(self.directory.name, 'spool')
+        for subdir in ['queue', 'claimed']:
+            os.makedirs(os.path.join(self.spool, subdir))
+        self.filter = os.path.join(self.directory.name, 'filter.py')
+        with open(self.filter, 'w') as f:
+            f.write(FILTER)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, subdir, name=''):
+        return os.path.join(self.spool, subdir, name)
+
+    def queue(self, name, body):
+        with open(self.path('queue', name), 'wb') as f:
+            f.write(b'From: a@example.org\r\n\r\n' + body + b'\r\n')
+
+    def run_spool(self, *options):
+        subprocess.run([sys.executable, SCRIPT, self.spool,
+                        '--filter', self.filter, *options],
+                       check=True, timeout=60)
+
+    def test_drain(self):
+        names = [f"msg{k:02}" for k in range(12)]
+        for name in names:
+            self.queue(name, name.encode())
+        self.queue('failing', b'FAIL')
+        self.queue('hanging', b'HANG')
+        # a fresh claim of a worker that crashed on this host
+        with open(self.path('claimed', f"crashed@{socket.gethostname()}."
+                                       f"{dead_pid()}@{time.time():.3f}"),
+                  'wb') as f:
+            f.write(b'From: a@example.org\r\n\r\ncrashed\r\n')
+        self.run_spool('--workers', '3', '--timeout', '2')
+
+        self.assertEqual(os.listdir(self.path('queue')), [])
+        self.assertEqual(os.listdir(self.path('claimed')), [])
+        self.assertEqual(os.listdir(self.path('tmp')), [])
+        self.assertEqual(sorted(os.listdir(self.path('outbox'))),
+                         ['crashed'] + names)
+        for name in names:
+            with open(self.path('outbox', name), 'rb') as f:
+                self.assertEqual(f.read(), b'X-Filtered: yes\r\n'
+                                 b'From: a@example.org\r\n\r\n'
+                                 + name.encode() + b'\r\n')
+        self.assertEqual(sorted(os.listdir(self.path('quarantine'))),
+                         ['failing', 'failing.err', 'hanging', 'hanging.err'])
+        with open(self.path('quarantine', 'failing.err')) as f:
+            self.assertIn("failing as asked", f.read())
+        with open(self.path('quarantine', 'hanging.err')) as f:
+            self.assertIn("timed out", f.read())
+
+        stats = []
+        for name in os.listdir(self.path('stats')):
+            with open(self.path('stats', name)) as f:
+                stats.append(json.load(f))
+        self.assertEqual(len(stats), 3)
+        self.assertEqual(sum(entry['processed'] for entry in stats), 13)
+        self.assertEqual(sum(entry['failed'] for entry in stats), 2)
+
+    def test_live_claim_kept(self):
+        self.queue('queued', b'queued')
+        claim = f"busy@{socket.gethostname()}.{os.getpid()}@{time.time():.3f}"
+        with open(self.path('claimed', claim), 'wb') as f:
+            f.write(b'From: a@example.org\r\n\r\nbusy\r\n')
+        self.run_spool('--workers', '2')
+        self.assertEqual(os.listdir(self.path('claimed')), [claim])
+        self.assertEqual(os.listdir(self.path('outbox')), ['queued'])
+
+
+if __name__ == '__main__':
+    unittest.main()
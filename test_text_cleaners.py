@@ -0,0 +1,100 @@
+"""
+  test_text_cleaners.py: Tests checking that applying the rules of
+  text_cleaners.py in a batch gives the same result as applying them text by
+  text and part by part.
+
+  Copyright (C) 2026 Erik Quaeghebeur
+
+  This program is free software: you can redistribute it and/or modify it under
+  the terms of the GNU General Public License as published by the Free Software
+  Foundation, either version 3 of the License, or (at your option) any later
+  version. This program is distributed in the hope that it will be useful, but
+  WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+  FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+  details. You should have received a copy of the GNU General Public License
+  along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import email
+import email.policy
+import text_cleaners
+
+
+email_policy = email.policy.EmailPolicy(
+  max_line_length=None, linesep="\r\n", refold_source='none')
+
+TEXTS = [
+    "",
+    "hello",
+    "see https://urldefense.proofpoint.com/v2/url?u=http-3A__example.com"
+    "&d=abc ",
+    "trailing spaces  \nand non-breaking ones\xa0\xa0\n-- \nsignature",
+    "*From:* Someone <someone@example.org>\n\n\nText\n\n\n\n[1]: link",
+    "> quoted\n> \n> \n> text\n",
+    "https://eur01.safelinks.protection.outlook.com/?url=https%3A%2F%2F"
+    "example.org%2F&data=x&reserved=0 and example.org <https://example.org>",
+    "Mail me at me@example.org <mailto:me@example.org>&nbsp;now",
+    "separator-like \x00\n content",
+]
+
+MESSAGE = """\
+From: a@example.org
+MIME-Version: 1.0
+Content-Type: multipart/mixed; boundary="b"
+
+--b
+Content-Type: text/plain; charset=utf-8
+Content-Transfer-Encoding: quoted-printable
+
+trailing spaces =20
+and the rest
+
+--b
+Content-Type: text/plain; charset=iso-8859-1; format=flowed
+Content-Transfer-Encoding: 8bit
+
+caf\xe9 text
+
+
+with breaks
+--b
+Content-Type: text/plain; charset=utf-8
+
+see https://urldefense.proofpoint.com/v2/url?u=http-3A__example.com&d=abc
+--b--
+""".replace('\n', '\r\n').encode('latin-1')
+
+
+class TestApplyRulesBatch(unittest.TestCase):
+
+    def test_texts(self):
+        for ruleset, rules in text_cleaners.RULESETS.items():
+            with self.subTest(ruleset=ruleset):
+                self.assertEqual(
+                    text_cleaners.apply_rules_batch(rules, TEXTS),
+                    [text_cleaners.apply_rules(rules, text)
+                     for text in TEXTS])
+
+    def test_parts(self):
+        for ruleset, rules in text_cleaners.RULESETS.items():
+            with self.subTest(ruleset=ruleset):
+                single = email.message_from_bytes(MESSAGE,
+                                                  policy=email_policy)
+                for part in single.walk():
+                    if part.get_content_type() == 'text/plain':
+                        text = text_cleaners.apply_rules(
+                            rules, part.get_content())
+                        part.set_content(text, cte='8bit')
+                batch = email.message_from_bytes(MESSAGE, policy=email_policy)
+                parts = [part for part in batch.walk()
+                         if part.get_content_type() == 'text/plain']
+                self.assertEqual(
+                    text_cleaners.apply_rules_batch(rules, parts), parts)
+                self.assertEqual(batch.as_bytes(policy=email_policy),
+                                 single.as_bytes(policy=email_policy))
+                self.assertIs(parts[0].policy, email_policy)
+
+
+if __name__ == '__main__':
+    unittest.main()
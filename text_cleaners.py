@@ -0,0 +1,164 @@
+"""
+  text_cleaners.py: A module with the regular-expression rules used by the
+  scripts that clean up text, i.e., clean-line-endings.py,
+  deduplicate-line-breaks.py, clean-text-version.py, and the cleanup after
+  conversion in html2alternative.py. Each rule is a (name, pattern,
+  replacement) triple and the rules of a rule list are applied in order,
+  either to a single text or to a batch of texts or message parts at once.
+
+  Copyright (C) 2026 Erik Quaeghebeur
+
+  This program is free software: you can redistribute it and/or modify it under
+  the terms of the GNU General Public License as published by the Free Software
+  Foundation, either version 3 of the License, or (at your option) any later
+  version. This program is distributed in the hope that it will be useful, but
+  WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+  FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+  details. You should have received a copy of the GNU General Public License
+  along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import re
+from urllib.parse import unquote
+
+
+# Custom replacement functions
+
+def rewriter_fix(rewriter=None):
+
+    def fixer(match):
+        link = match[1]
+        if rewriter == 'proofpoint2':
+            link = link.replace('_', '/').replace('-', '%')
+        if rewriter == 'proofpoint3':
+            link = link.replace('*', '%')
+        return unquote(link)
+
+    return fixer
+
+
+# clean-line-endings.py
+CLEAN_LINE_ENDINGS_RULES = [
+    ('spaces_at_line_end', re.compile(r"(?<!--|.:)[  ]+(?=\n)"), ''),
+]
+
+# deduplicate-line-breaks.py
+DEDUPLICATE_LINE_BREAKS_RULES = [
+    ('extra_br_needed',
+     re.compile(r"((?:\s*\[\d+\]:|\*\w+:\*) .*\n\n)(?!\n)"), r"\1\n"),
+    ('to_deduplicate', re.compile(r"(\n){2}(?!\s*\[\d+\])"), r"\1"),
+    ('quote_to_deduplicate', re.compile(r"(\n>+ ){2}(?!\s*\[\d+\])"), r"\1"),
+]
+
+# clean-text-version.py
+CLEAN_TEXT_VERSION_RULES = [
+    # warning note
+    ('exchangewarning_text', re.compile(
+        r"\[?"
+        r"([A-Z][\w\s'-]* \S*@\S*\. [A-Z][\w\s'-]+)\s*"
+        r"(<?https://aka\.ms/LearnAboutSenderIdentification>?\s*)"
+        r"\]?\n*"), ''),
+    ('exchangewarning_html', re.compile(
+        r"[A-Z]{0,1}[\w\s'-]*.*@.*\. "
+        r"\[\s*[A-Z][\w\s'-]+\]\[1\](?:\s*\n)+"
+        r"\s*\[1\]: https://aka.ms/LearnAboutSenderIdentification\n*"), ''),
+    # link rewriters
+    ('outlook', re.compile(
+        r'(?i)https://\w+.safelinks\.protection\.outlook\.com/'
+        r'[\w/-]*\?url=([^&]*)&\S*reserved=0'), rewriter_fix()),
+    ('proofpoint2', re.compile(
+        r'(?i)https://urldefense\.proofpoint\.com/v2/url\?'
+        r'u=([^=&]*)&\S*(?:(?= [^>\]\)])| ?)'), rewriter_fix('proofpoint2')),
+    ('proofpoint3', re.compile(
+        r'(?i)https://urldefense\.com/v3/__(.*)__;[^\$]*\$'),
+     rewriter_fix('proofpoint3')),
+    ('fireeye', re.compile(
+        r'(?i)https://protect3-qa\.fireeye\.com/v1/url\?.*'
+        r'u=([^>\s\]\)]+)'), rewriter_fix()),
+    ('vadesecure4', re.compile(
+        r'(?i)https://antiphishing.vadesecure.com/v4?.*u=(.*)'),
+     rewriter_fix()),
+    ('clicktime', re.compile(
+        r'(?i)https://[\w-]+\.trendmicro\.com(?:\:443)?/wis/'
+        r'clicktime/v1/query\?url=(.+)&umid=[\w-]+&auth=[\w-]+'),
+     rewriter_fix()),
+    # typical doublings
+    ('href', re.compile(
+        r'(?i)(?:https?://)?([^<>\[\]\(\)]{3,})\s*?'
+        r'[<\[\(] *?(https?://\1/?) *?[\)\]>]'), r'\2'),
+    ('mailto', re.compile(
+        r'(?i)([\'"]?)([^<>\[\]\(\)\'"]{3,})\1\s*?'
+        r'[<\[\(] *?(?:mailto:|sip:|tel:)?\2 *?[\)\]>]'), r'\2'),
+    # random stuff
+    ('nbsp', re.compile(r'&nbsp;'), ' '),
+]
+
+# html2alternative.py, cleanup of common issues after conversion
+HTML2TEXT_CLEANUP_RULES = [
+    ('nbsp', re.compile(r'\n{2}[*/]? [*/]?(?=\n)'), r'\n'),
+    ('spaces', re.compile(r'\n{2}  \n{3}'), r'\n'),
+    ('quote_nbsp', re.compile(r'(\n>+ ){2}[*/]? [*/]?(?=\n)'), r'\1'),
+    ('quote_spaces', re.compile(r'(\n>+ ){2}  \1{3}'), r'\1'),
+]
+
+# The rule lists by the name of the script that uses them
+RULESETS = {
+    'clean-line-endings': CLEAN_LINE_ENDINGS_RULES,
+    'deduplicate-line-breaks': DEDUPLICATE_LINE_BREAKS_RULES,
+    'clean-text-version': CLEAN_TEXT_VERSION_RULES,
+    'html2alternative': HTML2TEXT_CLEANUP_RULES,
+}
+
+
+def apply_rules(rules, text):
+    """Return the text with the substitutions of all rules applied in order"""
+    for name, pattern, replacement in rules:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class CachingHeaderFactory:
+    # parses each distinct header only once; header objects are immutable,
+    # so they can be shared between parts
+
+    def __init__(self, header_factory):
+        self.header_factory = header_factory
+        self.headers = {}
+
+    def __getitem__(self, name):
+        return self.header_factory[name]
+
+    def __call__(self, name, value):
+        key = (name, value)
+        if key not in self.headers:
+            self.headers[key] = self.header_factory(name, value)
+        return self.headers[key]
+
+
+def apply_rules_batch(rules, items):
+    """Return a list of the items with apply_rules applied to each of them
+
+    The items are texts or message parts. The content of a part is replaced
+    by the result, as 8bit text, like the text cleaning scripts do, and the
+    part itself is returned. Most of the time for a part goes to parsing
+    its headers, which the parts of a batch mostly share, so these are
+    parsed only once per batch.
+    """
+    results = []
+    policies = {}
+    for item in items:
+        if isinstance(item, str):
+            results.append(apply_rules(rules, item))
+            continue
+        policy = item.policy
+        if id(policy) not in policies:
+            policies[id(policy)] = policy.clone(
+                header_factory=CachingHeaderFactory(policy.header_factory))
+        item.policy = policies[id(policy)]
+        try:
+            item.set_content(apply_rules(rules, item.get_content()),
+                             cte='8bit')
+        finally:
+            item.policy = policy
+        results.append(item)
+    return results
@@ -21,6 +21,7 @@
 import sys
 import email
 import email.policy
+import mime_walk
 
 
 # Check whether no arguments have been given to the script (it takes none)
@@ -36,7 +37,7 @@ email_policy = email.policy.EmailPolicy(
 msg = email.message_from_bytes(sys.stdin.buffer.read(), policy=email_policy)
 
 # Transform 'quoted-printable' and 'base64' to '8bit'
-for part in msg.walk():
+for part in mime_walk.walk(msg):
     if part.get_content_maintype() == 'text':
         if part['Content-Transfer-Encoding'] in {'quoted-printable', 'base64'}:
             part.set_content(msg.get_content(), cte='8bit')